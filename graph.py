@@ -1,5 +1,7 @@
 # graph.py
 
+import re
+import threading
 from typing import Annotated, TypedDict
 
 # LangGraph core
@@ -8,8 +10,13 @@ from langgraph.graph.message import add_messages
 from langgraph.checkpoint.memory import InMemorySaver
 
 # Ollama LLM
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_ollama import ChatOllama
 
+# Local tools
+from rag_tool import NO_CONTEXT_SENTINEL, rag_tool
+from vision_tool import vision_pdf_search
+
 # 1️⃣ Define conversation state schema
 class State(TypedDict):
     messages: Annotated[list, add_messages]
@@ -17,22 +24,242 @@ class State(TypedDict):
 # 2️⃣ Initialize the graph builder
 graph_builder = StateGraph(State)
 
-# 3️⃣ Load the local Ollama model
+# 3️⃣ Load the local Ollama model. No bind_tools here: Ollama's gemma3
+#    templates lack the tools capability and reject any chat request that
+#    carries a tools array (HTTP 400), so the fenced protocol below is
+#    the only tool mechanism.
 llm = ChatOllama(
     model="gemma3:4b-it-qat",
     temperature=0.7,
 )
 
-# 4️⃣ Define the chatbot node
-def chatbot(state: State) -> dict:
+# 4️⃣ Policy prompt — Gemma3 has no native tool-calling API, so we teach it
+#    to emit a fenced ```tool_code``` block that we parse ourselves.
+POLICY = """You are a helpful assistant with access to the project's documents.
+You have two tools:
+- rag_search(query="..."): search the indexed documents for relevant text.
+- vision_pdf_search(query="..."): visually read PDF pages (scans, tables, charts).
+
+When a question needs the documents, reply with ONLY a fenced block like:
+```tool_code
+rag_search(query="your search terms")
+```
+Otherwise answer directly and conversationally."""
+
+# Matches the fenced tool block Gemma3 emits. The atomic group (?>...)
+# and the bounded char classes below keep malformed assistant output from
+# triggering catastrophic backtracking (requires Python 3.11+).
+_TOOL_FENCE = re.compile(r"```tool_code\s*(?>([^`]{0,4096}))```")
+
+# Pre-compiled call patterns — this parser runs on every assistant message,
+# so compiling once at import beats re.search's cache lookup per call
+_RAG_CALL_RE = re.compile(
+    r'(?:^|[\s;])rag_search(?:\.\w+)?\s*\(\s*(?:query\s*=\s*)?(?>[\'"]([^\'"]{1,512})[\'"])\s*\)'
+)
+_VISION_CALL_RE = re.compile(
+    r'(?:^|[\s;])vision_pdf_search(?:\.\w+)?\s*\(\s*(?:query\s*=\s*)?(?>[\'"]([^\'"]{1,512})[\'"])\s*\)'
+)
+
+
+def _has_tool_fence(text: str) -> bool:
+    return "```tool_code" in (text or "")
+
+
+# Greetings and other ultra-short turns can't benefit from retrieval
+_SMALLTALK_RE = re.compile(r"^(hi|hello|hey|thanks|thank you|bye)\b", re.I)
+
+
+def _should_rag(q: str) -> bool:
+    if _SMALLTALK_RE.match(q or ""):
+        return False
+    return len(q.split()) >= 3
+
+
+def _extract_tool_invocation_from_fence(text: str):
+    # Returns (tool_name, query) if the text contains a parseable tool call
+    if "```tool_code" not in (text or ""):
+        # Fast path: skip all regex work on ordinary replies
+        return None
+    m = _TOOL_FENCE.search(text)
+    if not m:
+        return None
+    body = m.group(1).strip()
+    mc = _RAG_CALL_RE.search(body)
+    if mc:
+        return "rag_search", mc.group(1)
+    mc = _VISION_CALL_RE.search(body)
+    if mc:
+        return "vision_pdf_search", mc.group(1)
+    return None
+
+
+def _last_user_text(msgs: list) -> str:
+    # Walk backwards to find the most recent user message; one type check
+    # per message instead of a getattr cascade
+    for m in reversed(msgs):
+        if isinstance(m, dict):
+            if m.get("role") != "user":
+                continue
+            content = m.get("content", "")
+        elif type(m).__name__ == "HumanMessage":
+            content = m.content
+        else:
+            continue
+        return content if isinstance(content, str) else str(content)
+    return ""
+
+
+async def _vision_if_empty(rag_out: str, query: str):
+    # Escalate to the vision tool when text retrieval came back empty.
+    # Exact sentinel comparison — a substring test could false-trigger the
+    # expensive vision path when retrieved content happens to contain the
+    # phrase (identity check first skips the string compare entirely)
+    if rag_out is NO_CONTEXT_SENTINEL or rag_out == NO_CONTEXT_SENTINEL:
+        return await vision_pdf_search.ainvoke({"query": query})
+    return None
+
+
+# Follow-up prompt for answering with tool output, compiled once at
+# import. The per-turn context goes AFTER the history: everything up to
+# the last user message stays byte-identical across calls, so Ollama's
+# automatic prefix KV cache keeps hitting instead of being invalidated
+# by fresh retrieval output at the front. Note _split_last_user below
+# does slice the list — one pointer-level copy per follow-up call; the
+# message objects themselves still pass through by reference, and the
+# KV-cache ordering is worth that small allocation.
+_CONTEXT_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        MessagesPlaceholder("history"),
+        ("system", "{ctx}"),
+        MessagesPlaceholder("last_user"),
+    ]
+)
+_context_chain = _CONTEXT_PROMPT | llm
+
+
+def _split_last_user(msgs: list):
+    # Split the conversation into (stable prefix, last user turn onward).
+    # Called at most once per turn; the slices copy pointers, not messages
+    for i in range(len(msgs) - 1, -1, -1):
+        m = msgs[i]
+        if isinstance(m, dict):
+            if m.get("role") == "user":
+                return msgs[:i], msgs[i:]
+        elif type(m).__name__ == "HumanMessage":
+            return msgs[:i], msgs[i:]
+    return msgs, []
+
+
+# Tool-name → coroutine dispatch for _run_tool_and_respond; adding a tool
+# is one entry here (plus a line in the POLICY prompt above)
+_DISPATCH = {
+    "rag_search": rag_tool.ainvoke,
+    "vision_pdf_search": vision_pdf_search.ainvoke,
+}
+
+
+async def _run_tool_and_respond(state_msgs: list, name: str, args, user_q: str) -> dict:
+    # Execute the requested tool, then let the model answer with its output
+    if not isinstance(args, dict):
+        args = {"query": str(args)}
+    runner = _DISPATCH.get(name)
+    if runner is None:
+        out = f"Unknown tool: {name}"
+    else:
+        out = await runner(args)
+        if name == "rag_search":
+            vision_out = await _vision_if_empty(out, user_q)
+            if vision_out is not None:
+                out = vision_out
+
+    prefix, last_user = _split_last_user(state_msgs)
+    followup = await _context_chain.ainvoke(
+        {"history": prefix, "ctx": out, "last_user": last_user}
+    )
+    return {"messages": [followup]}
+
+
+# 5️⃣ Policy node — injects the tool instructions once per thread
+def policy(state: State) -> dict:
+    for m in state["messages"]:
+        role = getattr(m, "type", None) or (
+            m.get("role") if isinstance(m, dict) else None
+        )
+        if role == "system":
+            return {"messages": []}
+    return {"messages": [{"role": "system", "content": POLICY}]}
+
+
+# 6️⃣ Define the chatbot node
+async def chatbot(state: State) -> dict:
+    # The last user question is needed by every tool branch; scan for it
+    # once here instead of re-walking the message list per call
+    user_q = _last_user_text(state["messages"])
+
     # Send the accumulated messages to the model and get a response
-    response = llm.invoke(state["messages"])
+    response = await llm.ainvoke(state["messages"])
+
+    text = response.content if isinstance(response.content, str) else str(response.content)
+
+    # A) Fenced tool invocation emitted as plain text
+    invocation = _extract_tool_invocation_from_fence(text)
+    if invocation:
+        name, query = invocation
+        return await _run_tool_and_respond(
+            state["messages"], name, {"query": query}, user_q
+        )
+
+    # B) Fence present but unparseable, or a blank reply — fall back to RAG
+    #    on the raw user question
+    if _has_tool_fence(text) or not text.strip():
+        if not _should_rag(user_q):
+            # Trivial turn — don't pay for embedding + vector search. Strip
+            # any tool fence first: it's plumbing, not an answer, and must
+            # not reach history or the terminal
+            cleaned = _TOOL_FENCE.sub("", text).strip()
+            return {
+                "messages": [
+                    {
+                        "role": "assistant",
+                        "content": cleaned or "Hi! How can I help you?",
+                    }
+                ]
+            }
+        # The sync vision tool runs in a thread via ainvoke, so a
+        # speculative prefetch can't be cancelled — it would render pages
+        # and decode on the same Gemma model even when RAG succeeds, and
+        # asyncio.run would block on that discarded work at shutdown.
+        # Only start it once retrieval has actually come back empty.
+        ctx = await rag_tool.ainvoke({"query": user_q})
+        if ctx is NO_CONTEXT_SENTINEL or ctx == NO_CONTEXT_SENTINEL:
+            ctx = await vision_pdf_search.ainvoke({"query": user_q})
+        prefix, last_user = _split_last_user(state["messages"])
+        followup = await _context_chain.ainvoke(
+            {"history": prefix, "ctx": ctx, "last_user": last_user}
+        )
+        return {"messages": [followup]}
+
+    # C) Plain conversational answer
     return {"messages": [response]}
 
-# 5️⃣ Assemble the graph
+# 7️⃣ Assemble the graph
+graph_builder.add_node("policy", policy)
 graph_builder.add_node("chatbot", chatbot)
-graph_builder.set_entry_point("chatbot")
+graph_builder.set_entry_point("policy")
+graph_builder.add_edge("policy", "chatbot")
 
-# 6️⃣ Compile with in-memory checkpointing
+# 8️⃣ Compile with in-memory checkpointing
 memory = InMemorySaver()
-graph = graph_builder.compile(checkpointer=memory)
\ No newline at end of file
+graph = graph_builder.compile(checkpointer=memory)
+
+
+# 9️⃣ Pre-warm the model in the background so the first user turn pays
+#    prefill + decode, not weight loading too
+def _warm_llm():
+    try:
+        llm.invoke([{"role": "system", "content": "warmup"}])
+    except Exception:
+        pass  # server not up yet — the first real call will load it
+
+
+threading.Thread(target=_warm_llm, daemon=True).start()
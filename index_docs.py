@@ -0,0 +1,124 @@
+# index_docs.py
+
+import asyncio
+import glob
+import os
+from multiprocessing import Pool, cpu_count
+
+import faiss
+import pypdfium2 as pdfium
+
+from langchain_community.document_loaders import TextLoader
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+from langchain_ollama import OllamaEmbeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# 1️⃣ Source documents and output store locations
+DOCS_DIR = "./docs"
+STORE_DIR = "faiss_store"
+
+# Below this corpus size an exact flat scan is already fast (and IVF
+# k-means needs enough training points per centroid anyway)
+IVF_MIN_VECTORS = 1024
+
+# Embedding requests per HTTP call, and how many calls to keep in flight
+# (match OLLAMA_NUM_PARALLEL on the server for real concurrency)
+EMBED_BATCH = 64
+EMBED_CONCURRENCY = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+
+
+async def _abatch_embed(embeddings, texts: list, batch: int = EMBED_BATCH) -> list:
+    # Embed in concurrent batches instead of one blocking request per chunk
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def _embed_batch(chunk_texts):
+        async with sem:
+            return await embeddings.aembed_documents(chunk_texts)
+
+    batches = [texts[i : i + batch] for i in range(0, len(texts), batch)]
+    results = await asyncio.gather(*(_embed_batch(b) for b in batches))
+    return [vec for batch_vecs in results for vec in batch_vecs]
+
+
+def _load_one(path: str) -> list:
+    # Top-level so the worker pool can pickle it. PDFs go through
+    # pypdfium2 (C-backed, several times faster than pure-Python pypdf),
+    # emitting the same Document shape PyPDFLoader produced.
+    if path.lower().endswith(".pdf"):
+        pdf = pdfium.PdfDocument(path)
+        docs = [
+            Document(
+                page_content=page.get_textpage().get_text_bounded(),
+                metadata={"source": path, "page": i},
+            )
+            for i, page in enumerate(pdf)
+        ]
+        pdf.close()
+        return docs
+    return TextLoader(path).load()
+
+
+# 2️⃣ Load every supported document under ./docs — each file is independent,
+#    so they load in parallel worker processes (PDF text extraction is the
+#    slow, CPU-bound part)
+def load_docs() -> list:
+    paths = []
+    for ext in ("txt", "md", "pdf"):
+        paths.extend(
+            glob.glob(os.path.join(DOCS_DIR, "**", f"*.{ext}"), recursive=True)
+        )
+    if not paths:
+        return []
+    if len(paths) == 1:
+        return _load_one(paths[0])
+    with Pool(min(len(paths), cpu_count())) as pool:
+        nested = pool.map(_load_one, paths)
+    return [doc for file_docs in nested for doc in file_docs]
+
+
+# 3️⃣ Chunk, embed, and persist the FAISS store
+def build_index() -> None:
+    docs = load_docs()
+    if not docs:
+        print(f"No documents found under {DOCS_DIR}; nothing to index.")
+        return
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
+    chunks = splitter.split_documents(docs)
+
+    embeddings = OllamaEmbeddings(model="nomic-embed-text")
+    texts = [c.page_content for c in chunks]
+    metadatas = [c.metadata for c in chunks]
+    vectors = asyncio.run(_abatch_embed(embeddings, texts))
+    vs = FAISS.from_embeddings(
+        list(zip(texts, vectors)), embeddings, metadatas=metadatas
+    )
+
+    # 4️⃣ Re-store the vectors as int8 scalar-quantized (4× less RAM than
+    #    FP32, faster SIMD distance kernels, <1% recall loss on normalized
+    #    768-d embeddings); large corpora additionally get IVF cells so a
+    #    query scans ~nprobe/nlist of the vectors instead of all of them
+    n = vs.index.ntotal
+    d = vs.index.d
+    vecs = vs.index.reconstruct_n(0, n)
+    if n >= IVF_MIN_VECTORS:
+        nlist = min(256, n // 39)  # faiss wants ~39+ training points per centroid
+        quantizer = faiss.IndexFlatL2(d)
+        index = faiss.IndexIVFScalarQuantizer(
+            quantizer, d, nlist, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2
+        )
+    else:
+        index = faiss.IndexScalarQuantizer(
+            d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2
+        )
+    index.train(vecs)
+    index.add(vecs)
+    vs.index = index
+
+    vs.save_local(STORE_DIR)
+    print(f"Indexed {len(chunks)} chunks from {len(docs)} documents into {STORE_DIR}/")
+
+
+if __name__ == "__main__":
+    build_index()
@@ -1,19 +1,104 @@
 # main.py
 
+import asyncio
+
 from graph import graph
+from semantic_cache import SemanticCache
 
 # 1️⃣ Choose a thread ID for this conversation session.
 THREAD_ID = "user-session-1"
 
+# 2️⃣ Semantic answer cache — paraphrases of a recent question are served
+#    from here without re-running the LLM or the tools.
+answer_cache = SemanticCache()
+
+_FENCE_MARK = "```tool_code"
+
+
+async def _stream(init_state: dict, config: dict) -> str:
+    # Stream tokens to the terminal as the model produces them, so the
+    # user sees output at first-token time instead of after full decode.
+    # A ```tool_code fence ANYWHERE in a model call is internal tool
+    # plumbing: printing stops at the fence and the rest of that call is
+    # suppressed. A short tail is held back so a fence split across
+    # chunks never leaks to the terminal.
+    final_text = ""
+    printed = False
+    acc = ""  # text accumulated for the current model call
+    emitted = 0  # how much of acc has been printed
+    suppress = False
+    hold = len(_FENCE_MARK) - 1
+
+    def _emit(text: str):
+        nonlocal printed
+        if not text:
+            return
+        if not printed:
+            print("Assistant: ", end="", flush=True)
+            printed = True
+        print(text, end="", flush=True)
+
+    async for event in graph.astream_events(init_state, config, version="v2"):
+        kind = event["event"]
+        if kind == "on_chat_model_start":
+            # New model call — start accumulating afresh
+            acc, emitted, suppress = "", 0, False
+        elif kind == "on_chat_model_stream":
+            chunk = event["data"]["chunk"].content
+            if not chunk or suppress:
+                continue
+            acc += chunk
+            idx = acc.find(_FENCE_MARK)
+            if idx != -1:
+                _emit(acc[emitted:idx].rstrip())
+                suppress = True
+                continue
+            safe = len(acc) - hold
+            if safe > emitted:
+                _emit(acc[emitted:safe])
+                emitted = safe
+        elif kind == "on_chat_model_end":
+            # Flush the held-back tail of a clean call
+            if not suppress:
+                _emit(acc[emitted:])
+                emitted = len(acc)
+        elif kind == "on_chain_end" and event.get("name") == "chatbot":
+            # The node's stored message is authoritative: canned replies
+            # never hit the model, and gated turns strip fences that the
+            # raw stream still contained
+            msgs = (event["data"].get("output") or {}).get("messages") or []
+            if msgs:
+                last = msgs[-1]
+                final_text = (
+                    last.get("content")
+                    if isinstance(last, dict)
+                    else getattr(last, "content", "")
+                )
+
+    answer = final_text or (acc if not suppress else "")
+    if printed:
+        print()
+    elif answer:
+        print("Assistant:", answer)
+    return answer
+
+
 def stream_graph_updates(user_input: str):
+    try:
+        key, cached = answer_cache.lookup(user_input)
+    except Exception:
+        # Embedding model unavailable — just run the graph uncached
+        key, cached = None, None
+    if cached is not None:
+        print("Assistant:", cached)
+        return
+
     # Prepare initial state and configuration
     init_state = {"messages": [{"role": "user", "content": user_input}]}
     config = {"configurable": {"thread_id": THREAD_ID}}
-
-    # Stream responses from the graph
-    for event in graph.stream(init_state, config):
-        for value in event.values():
-            print("Assistant:", value["messages"][-1].content)
+    answer = asyncio.run(_stream(init_state, config))
+    if key is not None and answer:
+        answer_cache.store(key, answer)
 
 
 def main():
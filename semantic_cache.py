@@ -0,0 +1,87 @@
+# semantic_cache.py
+
+import time
+
+import faiss
+import numpy as np
+
+# Reuse the embedding model the RAG tool already loads
+from rag_tool import embeddings
+
+# 1️⃣ Cache tuning: how close a paraphrase must be to count as the same
+#    question, how long an answer stays fresh, and how many entries to keep
+SIM_THRESHOLD = 0.95
+TTL_SECONDS = 600
+MAX_ENTRIES = 256
+
+# Neighbors to consider per lookup — re-asked questions leave several
+# near-identical vectors behind, and the freshest one may not rank first
+LOOKUP_TOP_N = 5
+
+
+class SemanticCache:
+    """Embedding-keyed answer cache.
+
+    Stores (query embedding, answer) pairs in a FAISS inner-product index;
+    a lookup whose cosine similarity to a stored query clears the threshold
+    returns the cached answer without touching the LLM or tools.
+    """
+
+    def __init__(self, threshold: float = SIM_THRESHOLD, ttl: float = TTL_SECONDS):
+        self.threshold = threshold
+        self.ttl = ttl
+        self._index = None
+        self._entries = []  # (timestamp, answer) parallel to index rows
+        self._vectors = []  # row embeddings, kept so the index can rebuild
+
+    def _embed(self, text: str):
+        vec = np.asarray(embeddings.embed_query(text), dtype="float32")
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec.reshape(1, -1)
+
+    def lookup(self, question: str):
+        """Return (key, answer). answer is None on a miss; key is the
+        normalized embedding, reusable by store() to avoid re-embedding."""
+        key = self._embed(question)
+        if self._index is None or self._index.ntotal == 0:
+            return key, None
+        # Take the newest unexpired neighbor above threshold — an expired
+        # row can outrank the fresh answer stored after it, and top-1
+        # search would miss on that question forever
+        sims, ids = self._index.search(key, min(LOOKUP_TOP_N, self._index.ntotal))
+        now = time.monotonic()
+        best = None
+        for sim, hit in zip(sims[0], ids[0]):
+            if hit < 0 or float(sim) < self.threshold:
+                continue
+            ts, answer = self._entries[int(hit)]
+            if now - ts > self.ttl:
+                continue
+            if best is None or ts > best[0]:
+                best = (ts, answer)
+        return key, (best[1] if best else None)
+
+    def store(self, key, answer: str) -> None:
+        self._vectors.append(key)
+        self._entries.append((time.monotonic(), answer))
+        self._prune()
+        if self._index is None:
+            self._index = faiss.IndexFlatIP(key.shape[1])
+            self._index.add(np.vstack(self._vectors))
+        else:
+            self._index.add(key)
+
+    def _prune(self) -> None:
+        # Drop expired rows and enforce the size bound; rebuilding a flat
+        # index over a few hundred vectors is negligible next to a decode
+        now = time.monotonic()
+        live = [
+            i for i, (ts, _) in enumerate(self._entries) if now - ts <= self.ttl
+        ][-MAX_ENTRIES:]
+        if len(live) == len(self._entries):
+            return
+        self._vectors = [self._vectors[i] for i in live]
+        self._entries = [self._entries[i] for i in live]
+        self._index = None  # rebuilt from _vectors by store()
@@ -0,0 +1,191 @@
+# vision_tool.py
+
+import base64
+import glob
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import fitz  # PyMuPDF
+
+from langchain_core.tools import tool
+from langchain_ollama import ChatOllama
+
+from rag_tool import NO_CONTEXT_SENTINEL, STORE_DIR, load_retriever
+
+# 1️⃣ Gemma3 is multimodal, so the same local model reads rendered pages
+VISION_MODEL = "gemma3:4b-it-qat"
+
+# 2️⃣ Where the project PDFs live
+DOCS_DIR = "./docs"
+
+# 3️⃣ Render settings. 150 DPI is plenty for the vision model and writes
+#    ~1.8× fewer bytes than 200 (cost scales with DPI²); raise via env if
+#    answers on fine print come back wrong.
+RENDER_DPI = int(os.environ.get("RENDER_DPI", "150"))
+MAX_PAGES = 3
+
+# Discovered PDFs, invalidated when the docs directory's mtime changes —
+# avoids re-walking the tree on every vision call
+_PDF_CACHE = {"mtime": None, "pdfs": []}
+
+
+def _find_pdfs() -> list:
+    try:
+        mtime = os.stat(DOCS_DIR).st_mtime
+    except OSError:
+        return []
+    if mtime != _PDF_CACHE["mtime"]:
+        _PDF_CACHE["pdfs"] = sorted(
+            glob.iglob(os.path.join(DOCS_DIR, "**", "*.pdf"), recursive=True)
+        )
+        _PDF_CACHE["mtime"] = mtime
+    return _PDF_CACHE["pdfs"]
+
+
+def _render_one(pdf_path: str, page_index: int, dpi: int, out_dir: str) -> str:
+    # Top-level so the process pool can pickle it; fitz Document objects
+    # can't cross process boundaries, so each worker reopens the file
+    doc = fitz.open(pdf_path)
+    pix = doc.load_page(page_index).get_pixmap(dpi=dpi)
+    # Prefix a hash of the full path — same-named PDFs in different
+    # subdirectories must not overwrite each other's pages when workers
+    # write concurrently
+    tag = hashlib.md5(pdf_path.encode()).hexdigest()[:8]
+    fp = os.path.join(
+        out_dir, f"{tag}-{os.path.basename(pdf_path)}-{page_index}.png"
+    )
+    pix.save(fp)  # PyMuPDF writes PNG natively — single encode, no PIL
+    doc.close()
+    return fp
+
+
+def _pdf_to_images(pdf_path: str, out_dir: str, max_pages: int = MAX_PAGES) -> list:
+    # Rasterize the first few pages to PNG files the vision model can read.
+    # Rasterization is CPU-bound and holds the GIL inside PyMuPDF, so pages
+    # render in parallel worker processes.
+    doc = fitz.open(pdf_path)
+    pages = min(max_pages, doc.page_count)
+    doc.close()
+    if pages == 0:
+        return []
+    if pages == 1:
+        return [_render_one(pdf_path, 0, RENDER_DPI, out_dir)]
+    with ProcessPoolExecutor(max_workers=min(pages, os.cpu_count() or 1)) as ex:
+        return list(
+            ex.map(
+                _render_one,
+                [pdf_path] * pages,
+                range(pages),
+                [RENDER_DPI] * pages,
+                [out_dir] * pages,
+            )
+        )
+
+
+def _render_specific_pages(targets: list, out_dir: str) -> list:
+    # targets is a list of (pdf_path, page_index) pairs
+    if len(targets) == 1:
+        pdf_path, page_index = targets[0]
+        return [_render_one(pdf_path, page_index, RENDER_DPI, out_dir)]
+    with ProcessPoolExecutor(max_workers=min(len(targets), os.cpu_count() or 1)) as ex:
+        return list(
+            ex.map(
+                _render_one,
+                [t[0] for t in targets],
+                [t[1] for t in targets],
+                [RENDER_DPI] * len(targets),
+                [out_dir] * len(targets),
+            )
+        )
+
+
+def _retrieve_page_targets(query: str, k: int = MAX_PAGES) -> list:
+    # Ask the text index which PDF pages matter for this query so we only
+    # rasterize those, instead of the first pages of an arbitrary PDF
+    try:
+        docs = load_retriever(STORE_DIR, k=k).invoke(query)
+    except RuntimeError:
+        return []
+    targets = []
+    seen = set()
+    for d in docs:
+        src = d.metadata.get("source")
+        page = d.metadata.get("page")
+        if not src or not src.lower().endswith(".pdf") or page is None:
+            continue
+        if (src, page) in seen:
+            continue
+        seen.add((src, page))
+        targets.append((src, int(page)))
+    return targets
+
+
+def _image_to_data_url(path: str) -> str:
+    with open(path, "rb") as f:
+        b64 = base64.b64encode(f.read()).decode("ascii")
+    return f"data:image/png;base64,{b64}"
+
+
+@lru_cache(maxsize=1)
+def _get_vision_llm(model: str, temperature: float) -> ChatOllama:
+    # One client per process, mirroring rag_tool._cached_store — a
+    # fresh ChatOllama per call made Ollama re-resolve the model each time
+    return ChatOllama(model=model, temperature=temperature)
+
+
+def _docs_signature() -> tuple:
+    # Hashable fingerprint of the PDFs on disk; part of the cache key so
+    # edited or added documents invalidate stale answers
+    sig = []
+    for p in _find_pdfs():
+        try:
+            sig.append((p, os.stat(p).st_mtime))
+        except OSError:
+            continue
+    return tuple(sig)
+
+
+@lru_cache(maxsize=64)
+def _vision_cached(query: str, _sig: tuple) -> str:
+    with tempfile.TemporaryDirectory() as out_dir:
+        targets = _retrieve_page_targets(query)
+        if targets:
+            image_paths = _render_specific_pages(targets, out_dir)
+        else:
+            # No index or no hits — fall back to the first PDF under ./docs
+            pdfs = _find_pdfs()
+            if not pdfs:
+                return NO_CONTEXT_SENTINEL
+            image_paths = _pdf_to_images(pdfs[0], out_dir)
+        if not image_paths:
+            return NO_CONTEXT_SENTINEL
+
+        vision_llm = _get_vision_llm(VISION_MODEL, 0.2)
+        content = [
+            {
+                "type": "text",
+                "text": (
+                    "Answer the question using only what you can see in these "
+                    f"document pages.\n\nQuestion: {query}"
+                ),
+            }
+        ] + [
+            {"type": "image_url", "image_url": {"url": _image_to_data_url(p)}}
+            for p in image_paths
+        ]
+        response = vision_llm.invoke([{"role": "user", "content": content}])
+
+    return "CONTEXT:\n" + response.content
+
+
+@tool
+def vision_pdf_search(query: str) -> str:
+    """Answer a query by visually reading pages of the project PDFs.
+
+    Use this when text retrieval fails, e.g. for scanned PDFs, tables,
+    charts or diagrams that plain text search cannot see.
+    """
+    return _vision_cached(query, _docs_signature())